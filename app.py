@@ -1,17 +1,70 @@
 # Import FastAPI - the main framework for building our web API
 from fastapi import FastAPI, HTTPException
 # Import HTMLResponse - allows us to return HTML content to the browser
-from fastapi.responses import HTMLResponse
+# Import StreamingResponse - lets us send generated tokens as they are produced
+from fastapi.responses import HTMLResponse, StreamingResponse
 # Import StaticFiles - for serving static files like CSS and JavaScript
 from fastapi.staticfiles import StaticFiles
 # Import BaseModel from Pydantic - used for data validation and defining request/response models
 from pydantic import BaseModel
 # Import transformers library components - these handle loading and using the AI model
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    GenerationConfig,
+    GPTQConfig,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+)
+# Try to import llama.cpp's Python bindings - an optional backend for CPU-only
+# machines whose hand-vectorized int4 kernels (AVX2/AVX-512/NEON) beat the
+# PyTorch CPU path by a wide margin
+try:
+    from llama_cpp import Llama
+except ImportError:
+    # Not installed - the PyTorch path below is used instead
+    Llama = None
+# Check for optimum-quanto - an optional dependency that lets transformers
+# quantize the KV cache to int8 on the fly (see the generation config below)
+try:
+    import optimum.quanto  # noqa: F401 - only probed for availability
+    QUANTO_AVAILABLE = True
+except ImportError:
+    QUANTO_AVAILABLE = False
+# Check for the GPTQ loading stack - optional dependencies that enable the
+# int4 weight path on CUDA (see the model load below); transformers needs
+# optimum, accelerate and a GPTQ kernel package (gptqmodel or auto-gptq)
+try:
+    import accelerate  # noqa: F401 - only probed for availability
+    import optimum  # noqa: F401 - only probed for availability
+    try:
+        import gptqmodel  # noqa: F401 - only probed for availability
+    except ImportError:
+        import auto_gptq  # noqa: F401 - only probed for availability
+    GPTQ_AVAILABLE = True
+except ImportError:
+    GPTQ_AVAILABLE = False
 # Import torch - PyTorch deep learning framework (needed for the model to run)
 import torch
 # Import uvicorn - ASGI server that runs our FastAPI application
 import uvicorn
+# Import asyncio - used to push blocking generation work off the event loop
+import asyncio
+# Import threading - a lock keeps concurrent requests off the shared KV cache
+import threading
+# Import json - used to escape streamed tokens into single-line SSE payloads
+import json
+# Import queue - ferries llama.cpp tokens from the generation thread to the SSE loop
+import queue
+# Import OrderedDict - backs the least-recently-used cache of finished answers
+from collections import OrderedDict
+# Import os - used to locate the optional GGUF model file and count CPU cores
+import os
+
+# We only ever run inference, never training, so turn autograd off globally
+# This saves the per-tensor autograd bookkeeping on every forward pass
+torch.set_grad_enabled(False)
 
 # Create an instance of FastAPI application with a custom title
 # This title will appear in the auto-generated API documentation
@@ -27,6 +80,12 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 class Question(BaseModel):
     question: str  # The user's question as a string
 
+# Read the chat page into memory once at startup
+# The file never changes while the server runs, so re-reading it from disk
+# on every GET "/" would just be a wasted syscall per request
+with open("templates/index.html", "rb") as f:
+    INDEX_HTML = f.read()
+
 # Print a message to console indicating the model loading process has started
 print("Loading model...")
 
@@ -34,48 +93,382 @@ print("Loading model...")
 # TinyLlama is a small (1.1B parameters) language model optimized for chat
 huggingface_model = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
 
-# Load the pre-trained model from Hugging Face
-# AutoModelForCausalLM automatically selects the right model architecture
-# from_pretrained downloads the model files if not already cached locally
-model = AutoModelForCausalLM.from_pretrained(huggingface_model)
+# Pick the device first so we can choose the matching dtype and quantization below
+# CUDA if a GPU is present, otherwise MPS (Apple's GPU backend), otherwise CPU
+if torch.cuda.is_available():
+    device = torch.device("cuda")
+    print("Device set to use cuda")
+elif torch.backends.mps.is_available():
+    device = torch.device("mps")
+    print("Device set to use mps")
+else:
+    device = torch.device("cpu")
+    print("Device set to use cpu")
+
+# Path to an int4 GGUF-quantized TinyLlama for the llama.cpp backend
+# (e.g. tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf from the model's GGUF repo)
+GGUF_MODEL_PATH = os.environ.get("GGUF_MODEL_PATH", "tinyllama-q4_k_m.gguf")
+
+# On CPU-only machines, prefer llama.cpp over PyTorch when it is available
+# Its SIMD-optimized q4 matmul kernels are far faster than PyTorch CPU for
+# llama-family decode; GPU devices keep the PyTorch/transformers path
+# Falls back to PyTorch when the package or the GGUF file is missing
+llama_model = None
+if device.type == "cpu" and Llama is not None and os.path.exists(GGUF_MODEL_PATH):
+    print("Loading GGUF model via llama.cpp...")
+    llama_model = Llama(
+        model_path=GGUF_MODEL_PATH,  # The int4-quantized model weights
+        n_ctx=512,  # Context window, matching the static cache length
+        n_threads=os.cpu_count(),  # Use every core for the matmuls
+        verbose=False,  # Keep startup logs quiet
+    )
+
+# The PyTorch model is only loaded when llama.cpp is not serving this machine
+model = None
+if llama_model is None:
+    # Choose the dtype for the weights instead of the default fp32
+    # Half-precision halves the memory footprint and the bytes read per token,
+    # which roughly doubles decode speed since generation is memory-bandwidth bound
+    # MPS and CUDA use float16 (the GPTQ int4 kernels below compute in fp16,
+    # and bfloat16 support on MPS is partial)
+    # CPU stays fp32 because dynamic int8 quantization (below) requires fp32 modules
+    if device.type == "cpu":
+        model_dtype = torch.float32
+    else:
+        model_dtype = torch.float16
+
+    # On CUDA, use int4 weight-only (GPTQ) weights instead of 16-bit ones
+    # Decode reads every weight per generated token, so int4 quarters the bytes
+    # streamed per matmul vs fp16 - roughly a 2x decode speedup on consumer GPUs
+    # We load a pre-quantized checkpoint (group_size=128); the kernel unpacks
+    # 4-bit weights to fp16 in-register, so activations stay in 16-bit
+    # Guarded like the other optional backends: when the GPTQ packages are
+    # not installed, fall back to the plain fp16 load instead of crashing
+    model_checkpoint = huggingface_model
+    quantization_config = None
+    if device.type == "cuda" and GPTQ_AVAILABLE:
+        model_checkpoint = "TheBloke/TinyLlama-1.1B-Chat-v1.0-GPTQ"
+        quantization_config = GPTQConfig(bits=4, group_size=128)
+
+    # Load the pre-trained model from Hugging Face
+    # AutoModelForCausalLM automatically selects the right model architecture
+    # from_pretrained downloads the model files if not already cached locally
+    # torch_dtype loads the weights directly in the chosen dtype instead of fp32
+    # low_cpu_mem_usage avoids materializing a second full copy while loading
+    # device_map places the quantized weights straight onto the GPU
+    # attn_implementation="sdpa" uses torch's fused scaled_dot_product_attention
+    # instead of the eager path, which materializes the full QK^T score matrix
+    # in memory; the fused kernel computes softmax(QK^T)V in tiles instead
+    model = AutoModelForCausalLM.from_pretrained(
+        model_checkpoint,
+        torch_dtype=model_dtype,
+        low_cpu_mem_usage=True,
+        quantization_config=quantization_config,
+        device_map={"": 0} if quantization_config is not None else None,
+        attn_implementation="sdpa",
+    )
+
+    # Move the model onto the chosen device
+    # Quantized models are already placed on the GPU by the loader and cannot be moved
+    if quantization_config is None:
+        model = model.to(device)
+
+    # On CPU, quantize the Linear layers in place to dynamic int8
+    # This swaps in fused int8 linear kernels and halves weight bytes streamed
+    # per token, covering ~99% of the parameters; everything else stays fp32
+    if device.type == "cpu":
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+    # Put the model in evaluation mode (disables dropout and other training-only behavior)
+    model.eval()
+
+    # Compile the model's forward pass to cut per-op Python/dispatcher overhead,
+    # which dominates single-batch decoding. "reduce-overhead" enables CUDA graphs
+    # and inductor fusions; dynamic=True tolerates the growing sequence length.
+    # Skipped on MPS because inductor support there is still limited.
+    if device.type != "mps":
+        model.forward = torch.compile(
+            model.forward,
+            mode="reduce-overhead",
+            fullgraph=False,
+            dynamic=True,
+        )
 
 # Load the tokenizer for this model
 # Tokenizer converts text into numbers (tokens) that the model can understand
 # It also converts the model's output numbers back into readable text
 tokenizer = AutoTokenizer.from_pretrained(huggingface_model)
 
-# Move model to MPS device if available for GPU acceleration
-if torch.backends.mps.is_available():
-    device = torch.device("mps")
-    model = model.to(device)
-    print("Device set to use mps")
-else:
-    device = torch.device("cpu")
-    print("Device set to use cpu")
+# Configure padding so prompts of different lengths can share one batch
+# Left-padding keeps every prompt's last token in the final position, which is
+# what decoding continues from; Llama tokenizers ship without a pad token,
+# so reuse EOS (the attention mask hides the padding either way)
+tokenizer.padding_side = "left"
+if tokenizer.pad_token is None:
+    tokenizer.pad_token = tokenizer.eos_token
+
+# Constant system prompt placed in front of every question
+SYSTEM_PROMPT = "You are a friendly chatbot who gives short, helpful answers."
+
+# Pre-tokenize the constant parts of TinyLlama's chat template once at startup
+# Re-running the template and BPE over this fixed text on every request is
+# pure Python overhead; at request time only the user's own words get
+# tokenized and the token IDs are concatenated around them
+# The prefix keeps the BOS token; the later pieces must not add another one
+PROMPT_PREFIX_IDS = tokenizer(f"<|system|>\n{SYSTEM_PROMPT}</s>\n<|user|>\n").input_ids
+PROMPT_SUFFIX_IDS = tokenizer("</s>\n<|assistant|>\n", add_special_tokens=False).input_ids
+
+# Build the full token ID list for one question: prefix + user text + suffix
+def build_prompt_ids(question: str) -> list[int]:
+    user_ids = tokenizer(question, add_special_tokens=False).input_ids
+    return PROMPT_PREFIX_IDS + user_ids + PROMPT_SUFFIX_IDS
 
-# Create a text generation pipeline - this simplifies using the model
-# Pipeline handles tokenization, model inference, and decoding automatically
-text_generator = pipeline(
-    "text-generation",  # Specifies we want to generate text (not classify, translate, etc.)
-    model=model,  # Pass in our loaded model
-    tokenizer=tokenizer,  # Pass in our loaded tokenizer
-    device=device  # Explicitly pass the device
+# Text form of the same prompt for the llama.cpp backend, which takes strings
+def build_prompt_text(question: str) -> str:
+    return f"<|system|>\n{SYSTEM_PROMPT}</s>\n<|user|>\n{question}</s>\n<|assistant|>\n"
+
+# Move tokenized inputs onto the model's device
+# On CUDA, staging the tensors in pinned (page-locked) host memory lets the
+# copy run as an async DMA transfer with non_blocking=True, overlapping with
+# whatever the GPU is still finishing, instead of a blocking pageable copy
+# pin_memory is CUDA-only, so MPS/CPU just do a plain move
+def move_inputs_to_device(inputs):
+    if device.type == "cuda":
+        for name, tensor in inputs.items():
+            inputs[name] = tensor.pin_memory().to(device, non_blocking=True)
+        return inputs
+    return inputs.to(device)
+
+# Build the generation settings once at startup instead of per request
+# The HF pipeline wrapper re-runs its pre/post-processing and validation on
+# every call, which dominates latency for short prompts; calling
+# model.generate directly with a prebuilt GenerationConfig avoids all of that
+gen_config = GenerationConfig(
+    max_new_tokens=50,  # Generate up to 50 new tokens (reduced for speed)
+    # Greedy decoding: pick the most likely token with a plain argmax
+    # The temperature-0.2 sampling used before was near-deterministic anyway,
+    # but still paid for a softmax, RNG state and a multinomial draw on every
+    # step; greedy skips all three and makes answers fully cacheable
+    do_sample=False,
+    pad_token_id=tokenizer.eos_token_id,  # Prevent warnings about padding
+    eos_token_id=tokenizer.eos_token_id,  # Stop a sequence as soon as it emits EOS
+    # Use a fixed-size (static) KV cache instead of one that grows per step
+    # Dynamic cache shapes defeat CUDA graph capture and force torch.compile
+    # to respecialize; a static cache keeps the shapes stable across requests
+    cache_implementation="static",
 )
 
+# When optimum-quanto is installed, quantize the KV cache to int8 instead
+# Every decode step re-reads all cached keys/values, so 8-bit entries halve
+# that attention bandwidth; the newest residual_length tokens stay in 16-bit
+# so the quantization error never touches the most recent context
+# (quantized and static caching are mutually exclusive, so this replaces the
+# static cache rather than stacking on top of it)
+if QUANTO_AVAILABLE:
+    gen_config.cache_implementation = "quantized"
+    gen_config.cache_config = {"backend": "quanto", "nbits": 8, "residual_length": 64}
+
+# Stopping criterion that ends generation at the first blank line
+# Each decode step costs a full pass over the weights, and the model often
+# finishes a short answer well before the max_new_tokens budget, then starts
+# a new paragraph; cutting at the paragraph break skips those wasted steps
+# A sequence counts as done when it has emitted EOS *or* a blank line, and
+# that is remembered per sequence - a sequence that hit its blank line keeps
+# receiving filler tokens while the rest of the batch finishes, so checking
+# only the current text would let one EOS-finished sequence pin the whole
+# batch to the full token budget
+class StopOnBlankLine(StoppingCriteria):
+    def __init__(self, prompt_length: int, batch_size: int):
+        # Remember how many tokens belong to the prompt so a blank line in
+        # the question itself doesn't stop generation immediately
+        self.prompt_length = prompt_length
+        # Which sequences have already reached EOS or a blank line
+        self.finished = [False] * batch_size
+
+    def __call__(self, input_ids, scores, **kwargs):
+        for index, sequence in enumerate(input_ids):
+            if self.finished[index]:
+                continue
+            # EOS ends a sequence for good (finished sequences are padded
+            # with EOS afterwards, so the last token covers both cases)
+            if int(sequence[-1]) == tokenizer.eos_token_id:
+                self.finished[index] = True
+                continue
+            # Decode only the tail: a blank line spans at most the last few
+            # tokens, and re-decoding the whole answer every step would put
+            # O(answer length) Python work inside the decode loop
+            tail_start = max(self.prompt_length, input_ids.shape[1] - 3)
+            tail = tokenizer.decode(sequence[tail_start:], skip_special_tokens=True)
+            if "\n\n" in tail:
+                self.finished[index] = True
+        # Stop once every sequence in the batch is done
+        return all(self.finished)
+
+# Run one short generation before serving traffic so the 30-60s compilation
+# cost (and any lazy kernel/cache initialization) is paid at startup rather
+# than by the first user request
+print("Warming up...")
+if llama_model is not None:
+    # llama.cpp initializes its buffers lazily; one tiny completion warms them
+    llama_model(build_prompt_text("warmup"), max_tokens=4)
+else:
+    with torch.inference_mode():
+        warmup_inputs = tokenizer("warmup", return_tensors="pt").to(device)
+        model.generate(**warmup_inputs, generation_config=gen_config, max_new_tokens=4)
+
 # Print confirmation that the model loaded successfully
 print("Model loaded successfully!")
 
+# Generation runs in worker threads; this lock makes sure only one thread at
+# a time touches the model
+generate_lock = threading.Lock()
+
+# Batching settings for coalescing concurrent /ask requests
+# Decode is memory-bandwidth bound: one forward pass streams all the weights
+# whether it decodes 1 prompt or 8, so batching concurrent users is nearly
+# free. Requests arriving within the window share a single generate call.
+MAX_BATCH_SIZE = 8  # Most prompts to run in one forward pass
+BATCH_WINDOW_SECONDS = 0.005  # How long to wait for more requests to coalesce
+
+# Queue of (question, future) pairs waiting to be generated
+# ask() enqueues here and awaits its future; the batch worker below drains it
+request_queue: asyncio.Queue = asyncio.Queue()
+
+# LRU cache of finished answers, keyed by the normalized question
+# Demo questions repeat a lot, and a hit replaces a full generation (50
+# forward passes) with a dict lookup. Only used while decoding is
+# deterministic (do_sample=False), since sampled answers vary run to run.
+RESPONSE_CACHE_MAX_SIZE = 1024
+response_cache: OrderedDict = OrderedDict()
+response_cache_lock = threading.Lock()
+
+# Normalize the question so trivial variations share one cache entry
+def cache_key(question: str) -> str:
+    return question.strip().lower()
+
+# Look up a cached answer; returns None on a miss or when sampling is on
+def cache_get(question: str):
+    if gen_config.do_sample:
+        return None
+    with response_cache_lock:
+        key = cache_key(question)
+        if key in response_cache:
+            # Mark the entry as recently used so it isn't evicted soon
+            response_cache.move_to_end(key)
+            return response_cache[key]
+    return None
+
+# Store a finished answer, evicting the least recently used entry when full
+def cache_put(question: str, answer: str):
+    if gen_config.do_sample:
+        return
+    with response_cache_lock:
+        response_cache[cache_key(question)] = answer
+        response_cache.move_to_end(cache_key(question))
+        while len(response_cache) > RESPONSE_CACHE_MAX_SIZE:
+            response_cache.popitem(last=False)
+
+# Synchronous core of /ask: tokenize a batch, generate, decode each answer
+# This is blocking (it holds the GPU for the whole generation), so it is
+# always called from a worker thread rather than the event loop
+def generate_answers(questions: list[str]) -> list[str]:
+    # llama.cpp backend: it has no batched API, so answer the prompts one by
+    # one - still coalesced behind a single lock acquisition and off the
+    # event loop. Its stop strings mirror the blank-line criterion below.
+    if llama_model is not None:
+        with generate_lock:
+            return [
+                llama_model(
+                    build_prompt_text(question),
+                    max_tokens=gen_config.max_new_tokens,
+                    temperature=0.0,  # Greedy, matching the PyTorch path
+                    stop=["\n\n"],
+                )["choices"][0]["text"]
+                for question in questions
+            ]
+
+    # Build each prompt from the cached template IDs (only the user's text is
+    # tokenized here), left-pad the shorter ones into one rectangular batch,
+    # and move the tensors to the model's device
+    prompt_ids = [build_prompt_ids(question) for question in questions]
+    inputs = move_inputs_to_device(tokenizer.pad({"input_ids": prompt_ids}, return_tensors="pt"))
+
+    # Run generation directly on the model with the prebuilt settings
+    # inference_mode disables autograd bookkeeping, which we never need here
+    # The stopping criterion ends the batch early once every answer is done
+    stop_criteria = StoppingCriteriaList(
+        [StopOnBlankLine(inputs.input_ids.shape[1], inputs.input_ids.shape[0])]
+    )
+    with generate_lock:
+        with torch.inference_mode():
+            output_ids = model.generate(
+                **inputs,
+                generation_config=gen_config,
+                stopping_criteria=stop_criteria,
+            )
+
+    # generate returns the (padded) prompt tokens followed by the new tokens,
+    # so decode only the tokens after the prompt to get just the answers
+    answers = tokenizer.batch_decode(
+        output_ids[:, inputs.input_ids.shape[1]:],
+        skip_special_tokens=True
+    )
+
+    # Cut each answer at its first blank line: in a mixed batch a sequence
+    # that stopped early keeps decoding filler tokens while the others
+    # finish, and even a batch of one ends with the blank line itself
+    # This also matches what the llama.cpp backend returns via stop=["\n\n"]
+    return [answer.split("\n\n", 1)[0] for answer in answers]
+
+# Background task that coalesces queued requests into batched generate calls
+# It waits for the first request, keeps collecting more for a few
+# milliseconds (up to the batch limit), then runs them all in one pass
+async def batch_worker():
+    loop = asyncio.get_running_loop()
+    while True:
+        # Block until at least one request is waiting
+        batch = [await request_queue.get()]
+
+        # Collect more requests until the window closes or the batch is full
+        deadline = loop.time() + BATCH_WINDOW_SECONDS
+        while len(batch) < MAX_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(request_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Run the whole batch in one generate call on a worker thread,
+        # then hand each caller its own answer (or the error) via its future
+        questions = [question for question, _ in batch]
+        try:
+            answers = await asyncio.to_thread(generate_answers, questions)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for (_, future), answer in zip(batch, answers):
+                if not future.done():
+                    future.set_result(answer)
+
+# Start the batch worker as soon as the server's event loop is running
+@app.on_event("startup")
+async def start_batch_worker():
+    asyncio.create_task(batch_worker())
+
 # Define a route for the root URL ("/") that returns HTML
 # The @app.get decorator means this function handles GET requests to "/"
 # response_class=HTMLResponse tells FastAPI we're returning HTML, not JSON
 @app.get("/", response_class=HTMLResponse)
 async def home():
-    # Open and read the HTML file from the templates folder
-    # "r" means read mode
-    with open("templates/index.html", "r") as f:
-        # Read the entire file content and return it
-        # This HTML will be rendered in the user's browser
-        return f.read()
+    # Return the page bytes cached at startup - no disk I/O per request
+    # This HTML will be rendered in the user's browser
+    return HTMLResponse(INDEX_HTML)
 
 # Define a route for "/ask" that accepts POST requests
 # This is where users send their questions to get AI responses
@@ -86,22 +479,25 @@ async def ask(question_data: Question):
         # If empty, raise an HTTP 400 Bad Request error with a message
         raise HTTPException(status_code=400, detail="No question provided")
     
+    # Serve straight from the cache when this question was answered before
+    # A hit skips the GPU entirely
+    cached_answer = cache_get(question_data.question)
+    if cached_answer is not None:
+        return {"answer": cached_answer}
+
     # Use try-except to catch any errors during text generation
     try:
-        # Generate a response using our text generation pipeline
-        response = text_generator(
-            question_data.question,  # The user's input question
-            max_new_tokens=50,  # Generate up to 50 new tokens (reduced for speed)
-            do_sample=True,  # Use sampling instead of greedy decoding for more varied responses
-            temperature=0.2,  # Controls randomness: 0.7 is balanced (lower=more focused, higher=more creative)
-            pad_token_id=tokenizer.eos_token_id  # Prevent warnings about padding
-        )
-        
-        # Extract the generated text from the response
-        # response is a list, we take the first item [0]
-        # Then get the 'generated_text' field which contains the complete output
-        answer = response[0]['generated_text']
-        
+        # Hand the question to the batch worker and wait for our answer
+        # Requests that arrive close together are generated in one forward
+        # pass; the worker runs the blocking generate on a thread, so the
+        # event loop stays free for /health, static files and other requests
+        future = asyncio.get_running_loop().create_future()
+        await request_queue.put((question_data.question, future))
+        answer = await future
+
+        # Remember the answer for the next time this question comes up
+        cache_put(question_data.question, answer)
+
         # Return the answer as a JSON object
         # FastAPI automatically converts this Python dict to JSON
         return {"answer": answer}
@@ -111,18 +507,198 @@ async def ask(question_data: Question):
         # Raise an HTTP 500 Internal Server Error with details about what went wrong
         raise HTTPException(status_code=500, detail=f"Error generating response: {str(e)}")
 
+# Define a streaming variant of "/ask" that sends tokens as they are generated
+# The chat UI uses this: time-to-first-token is one forward pass, so the user
+# starts reading while the rest of the answer is still being decoded
+# Total compute is unchanged; only the perceived latency drops
+@app.post("/ask/stream")
+async def ask_stream(question_data: Question):
+    # Check if the question field is empty or just whitespace
+    if not question_data.question:
+        # If empty, raise an HTTP 400 Bad Request error with a message
+        raise HTTPException(status_code=400, detail="No question provided")
+
+    # Serve a repeated question straight from the cache: the chat UI is where
+    # questions repeat most, so a hit here sends the whole answer as a single
+    # SSE frame plus the terminator without touching the model at all
+    cached_answer = cache_get(question_data.question)
+    if cached_answer is not None:
+        async def cached_stream():
+            yield f"data: {json.dumps(cached_answer)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(cached_stream(), media_type="text/event-stream")
+
+    # Set when generation dies part-way through, so a truncated answer is
+    # never stored in the cache
+    generation_failed = threading.Event()
+
+    if llama_model is not None:
+        # Run the llama.cpp stream eagerly on its own thread, feeding a queue
+        # the SSE loop reads from - mirroring the transformers streamer below
+        # Pulling the generator directly from the response would pace
+        # generation (and generate_lock) by the client's read speed, letting
+        # one slow SSE client block every /ask on a CPU deployment
+        token_queue: queue.Queue = queue.Queue()
+
+        def run_llama_generation():
+            try:
+                with generate_lock:
+                    for chunk in llama_model(
+                        build_prompt_text(question_data.question),
+                        max_tokens=gen_config.max_new_tokens,
+                        temperature=0.0,  # Greedy, matching the PyTorch path
+                        stop=["\n\n"],
+                        stream=True,
+                    ):
+                        token_queue.put(chunk["choices"][0]["text"])
+            except Exception as exc:
+                # Record the failure (the tokens streamed so far must not be
+                # cached as a complete answer) and surface it in the log
+                generation_failed.set()
+                print(f"Streaming generation failed: {exc}")
+            finally:
+                # Always deliver the stop signal so the reader never hangs
+                token_queue.put(None)
+
+        threading.Thread(target=run_llama_generation, daemon=True).start()
+        # Same 120s backstop as the transformers streamer: if the generation
+        # thread dies without the stop signal, the reader raises queue.Empty
+        # instead of blocking forever
+        token_source = iter(lambda: token_queue.get(timeout=120.0), None)
+    else:
+        # The streamer receives tokens from generate (running on its own thread)
+        # and hands them out as an iterator; skip_prompt drops the echoed question
+        # The prompt is built from the cached chat-template IDs, like the batched path
+        prompt_ids = build_prompt_ids(question_data.question)
+        inputs = move_inputs_to_device(tokenizer.pad({"input_ids": [prompt_ids]}, return_tensors="pt"))
+        # The timeout is a backstop: if the generation thread dies without
+        # ever signalling the streamer, the iterator raises instead of
+        # blocking this request's reader forever
+        streamer = TextIteratorStreamer(
+            tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=120.0
+        )
+
+        # Run generation on a dedicated thread, feeding tokens into the streamer
+        # The same blank-line criterion as the batched path stops early once the
+        # answer is finished instead of decoding the full token budget
+        stop_criteria = StoppingCriteriaList(
+            [StopOnBlankLine(inputs.input_ids.shape[1], inputs.input_ids.shape[0])]
+        )
+
+        def run_generation():
+            try:
+                with generate_lock:
+                    with torch.inference_mode():
+                        model.generate(
+                            **inputs,
+                            generation_config=gen_config,
+                            stopping_criteria=stop_criteria,
+                            streamer=streamer,
+                        )
+            except Exception as exc:
+                # Record the failure (the tokens streamed so far must not be
+                # cached as a complete answer) and surface it in the log
+                generation_failed.set()
+                print(f"Streaming generation failed: {exc}")
+            finally:
+                # Always deliver the stop signal, even when generate raises -
+                # otherwise the SSE reader below would wait for tokens that
+                # are never coming (generate only calls end() on success)
+                streamer.end()
+
+        threading.Thread(target=run_generation, daemon=True).start()
+        token_source = streamer
+
+    # Forward each token to the client as a Server-Sent Event
+    # The token source blocks while waiting for the next token, so pull
+    # from it via a worker thread to keep the event loop responsive
+    async def event_stream():
+        token_iterator = iter(token_source)
+        # Collect the streamed tokens so the finished answer can be cached
+        generated_pieces = []
+        completed = False
+        while True:
+            try:
+                token = await asyncio.to_thread(next, token_iterator, None)
+            except Exception:
+                # The backend failed mid-stream (generation error or streamer
+                # timeout); close the stream cleanly instead of hanging the
+                # client connection
+                break
+            if token is None:
+                completed = True
+                break
+            if token:
+                # Cut the stream at the first blank line: the stopping
+                # criterion ends generation there, but the final tokens can
+                # still carry text past the break, and the client should see
+                # the same trimmed answer as the batched and llama.cpp paths
+                combined = "".join(generated_pieces) + token
+                cut = combined.find("\n\n")
+                if cut != -1:
+                    # Keep only the part of this token before the blank line
+                    # (the break can start in an already-sent token, in which
+                    # case nothing more goes out)
+                    kept = token[: max(0, cut - (len(combined) - len(token)))]
+                    if kept:
+                        generated_pieces.append(kept)
+                        yield f"data: {json.dumps(kept)}\n\n"
+                    completed = True
+                    break
+                generated_pieces.append(token)
+                # json.dumps keeps the payload on one line even if the token
+                # contains newlines (SSE frames are delimited by blank lines)
+                yield f"data: {json.dumps(token)}\n\n"
+        # Remember the full answer so a repeat of this question skips
+        # generation; errors and empty streams are never cached
+        # Trailing newlines are stripped so a break that straddled two tokens
+        # caches the same trimmed text the batched path would return
+        if completed and generated_pieces and not generation_failed.is_set():
+            cache_put(question_data.question, "".join(generated_pieces).rstrip("\n"))
+        # Tell the client the answer is complete
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+# Admin endpoint to drop every cached answer (e.g. after changing the model
+# or the generation settings)
+@app.post("/cache/clear")
+async def clear_cache():
+    with response_cache_lock:
+        entries_removed = len(response_cache)
+        response_cache.clear()
+    # Report how many entries were dropped
+    return {"status": "cleared", "entries_removed": entries_removed}
+
 # Define a health check endpoint - useful for monitoring if the service is running
 # GET request to "/health" returns the service status
 @app.get("/health")
 async def health():
     # Return a simple JSON response indicating the service is healthy
-    # Also includes which model is loaded
-    return {"status": "healthy", "model": huggingface_model}
+    # Also includes which model is loaded and which backend is serving it
+    return {
+        "status": "healthy",
+        "model": huggingface_model,
+        "backend": "llama.cpp" if llama_model is not None else "transformers",
+    }
 
 # This block only runs if the script is executed directly (not imported as a module)
 if __name__ == '__main__':
     # Start the uvicorn server to run our FastAPI app
-    # app is our FastAPI instance
+    # Pass the app object itself: an import string would make uvicorn import
+    # this module a second time (once as __main__, once as "app"), loading
+    # and warming a second copy of the model for nothing. Multiple workers
+    # would do the same per process, so the app object single-worker setup
+    # is the right shape for one shared model.
     # host="127.0.0.1" means only accept connections from this computer (localhost)
     # port=8000 means the server listens on port 8000
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    # loop="uvloop" swaps the stdlib asyncio event loop for the faster uvloop
+    # http="httptools" uses the C HTTP parser instead of the pure-Python h11 one
+    uvicorn.run(
+        app,
+        host="127.0.0.1",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+    )
\ No newline at end of file
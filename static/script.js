@@ -39,8 +39,10 @@ async function askQuestion() {
     
     // Try-catch block to handle any errors that might occur
     try {
-        // Send a POST request to our backend API
-        const response = await fetch('/ask', {
+        // Send a POST request to the streaming endpoint
+        // The server sends tokens back as Server-Sent Events while the model
+        // is still generating, so we can show the answer as it is written
+        const response = await fetch('/ask/stream', {
             method: 'POST',  // Use POST method to send data
             headers: {
                 'Content-Type': 'application/json',  // Tell server we're sending JSON
@@ -48,24 +50,53 @@ async function askQuestion() {
             // Convert our question object to JSON string and send it
             body: JSON.stringify({ question: question })
         });
-        
-        // Parse the JSON response from the server
-        const data = await response.json();
-        
+
         // Remove the "Typing..." loading message
         chatContainer.removeChild(loadingMsg);
-        
+
         // Create a new div for the bot's response
         const botMsg = document.createElement('div');
         botMsg.className = 'message bot-message';
-        // Set the text to the AI's answer from the response
-        botMsg.textContent = data.answer;
-        // Add the bot's message to the chat
+        // Add the (still empty) bot message to the chat
         chatContainer.appendChild(botMsg);
-        
+
+        // Read the response body chunk by chunk as the tokens arrive
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            // Wait for the next chunk from the server
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            // Chunks can contain partial events, so accumulate into a buffer
+            buffer += decoder.decode(value, { stream: true });
+
+            // SSE events are separated by a blank line ("\n\n")
+            const events = buffer.split('\n\n');
+            // Keep the last (possibly incomplete) event in the buffer
+            buffer = events.pop();
+
+            for (const event of events) {
+                // Each event line looks like "data: <payload>"
+                if (!event.startsWith('data: ')) continue;
+                const payload = event.slice(6);
+
+                // "[DONE]" marks the end of the answer
+                if (payload === '[DONE]') continue;
+
+                // The payload is a JSON-encoded token; append it to the message
+                botMsg.textContent += JSON.parse(payload);
+                // Keep the newest text in view while the answer grows
+                chatContainer.scrollTop = chatContainer.scrollHeight;
+            }
+        }
+
     } catch (error) {
         // If anything goes wrong, remove the loading message
-        chatContainer.removeChild(loadingMsg);
+        // (it may already be gone if the stream failed part-way through)
+        if (loadingMsg.parentNode) chatContainer.removeChild(loadingMsg);
         
         // Create an error message to show the user
         const errorMsg = document.createElement('div');